@@ -7,7 +7,8 @@ try:
 except ImportError:
     # If that fails, try a direct import from the local file
     from hotkey import HotkeyHandler
-import time
+import threading
+import win32api
 
 def on_hotkey1_pressed():
     """Callback function for the first hotkey."""
@@ -51,16 +52,23 @@ def main():
     print("- Press Ctrl+Alt+2 to trigger the second hotkey")
     print("- Press Ctrl+C to exit")
     
-    try:
-        # Keep the main thread running
-        while True:
-            time.sleep(0.1)
-    except KeyboardInterrupt:
-        # Stop listening when the user presses Ctrl+C
-        print("\nStopping hotkey handlers...")
-        hotkey1.stop()
-        hotkey2.stop()
-        print("Exiting...")
+    # Block until Ctrl+C. The console control handler runs on its own thread,
+    # so it can wake up the main thread even though Event.wait() can't be
+    # interrupted by Ctrl+C on Windows.
+    exit_event = threading.Event()
+    
+    def on_console_ctrl(ctrl_type):
+        exit_event.set()
+        return True  # Handled, don't terminate the process yet
+    
+    win32api.SetConsoleCtrlHandler(on_console_ctrl, True)
+    exit_event.wait()
+    
+    # Stop listening when the user presses Ctrl+C
+    print("\nStopping hotkey handlers...")
+    hotkey1.stop()
+    hotkey2.stop()
+    print("Exiting...")
 
 if __name__ == "__main__":
     main()
@@ -2,495 +2,877 @@
 Hotkey registration and handling for Windows applications using the RegisterHotKey API
 """
 from typing import Callable, Dict, List, Optional, Set, Tuple, Any
+import functools
+import logging
+import re
 import threading
-import time
 import ctypes
+from ctypes import wintypes
 import atexit
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 import win32con
 import win32api
+import win32event
 import win32gui
-import sys
 
-# Import key mappings from keycodes module
+# Key name to virtual key code mappings from the keycodes module
 try:
     from .keycodes import vk_key_names
 except ImportError:
     # For direct imports or testing
-    try:
-        from keycodes import vk_key_names
-    except ImportError:
-        # Define a minimal set of key mappings if keycodes.py is not available
-        vk_key_names = {}
+    from keycodes import vk_key_names
+
+# Read-only copy of the key name mappings, built once at import
+_VK_MAP = MappingProxyType(dict(vk_key_names))
+
+log = logging.getLogger(__name__)
 
 # Windows message constants
 WM_HOTKEY = 0x0312
 WM_CLOSE = 0x0010  # Standard Windows close message
 WM_DESTROY = 0x0002  # Standard Windows destroy message
 WM_QUIT = 0x0012  # Standard Windows quit message
+WM_TIMER = 0x0113  # Standard Windows timer message
 WM_USER = 0x0400  # Base for user-defined messages
-WM_USER_CLEANUP = WM_USER + 1  # Custom message for cleanup
+WM_USER_REGISTER = WM_USER + 1  # Custom message to register a hotkey on the window thread
+WM_USER_UNREGISTER = WM_USER + 2  # Custom message to unregister a hotkey on the window thread
 
 # Define constants that might not be in win32con
 MOD_NOREPEAT = 0x4000  # Prevent auto-repeat when the hotkey is held down
+MOD_KEYS = 0x000F  # MOD_ALT | MOD_CONTROL | MOD_SHIFT | MOD_WIN, as reported in WM_HOTKEY
+HWND_MESSAGE = -3  # Parent for message-only windows
+ERROR_HOTKEY_ALREADY_REGISTERED = 1409
+MAX_HOTKEY_ID = 0xBFFF  # Highest hotkey ID RegisterHotKey accepts for an application
+
+# Interval for checking whether a hotkey with a release callback is still held down
+RELEASE_POLL_INTERVAL_MS = 16
+
+# Number of threads running hotkey callbacks. Each hotkey uses one at a time, so other
+# hotkeys are only delayed while all of them are busy
+CALLBACK_THREADS = 4
+
+# Modifier key names and their RegisterHotKey flags (read-only)
+_MOD_MAP = MappingProxyType({
+    'control': win32con.MOD_CONTROL,
+    'ctrl': win32con.MOD_CONTROL,
+    'alt': win32con.MOD_ALT,
+    'shift': win32con.MOD_SHIFT,
+    'win': win32con.MOD_WIN,
+    'windows': win32con.MOD_WIN,
+})
+
+# Splits a hotkey combination on '+', ignoring whitespace around it
+_SPLIT_RE = re.compile(r'\s*\+\s*')
+
+# user32 functions used on every hotkey, bound once with explicit prototypes.
+# With use_last_error, ctypes.get_last_error() reliably reports their errors.
+_user32 = ctypes.WinDLL('user32', use_last_error=True)
+
+_RegisterHotKey = _user32.RegisterHotKey
+_RegisterHotKey.argtypes = [wintypes.HWND, ctypes.c_int, wintypes.UINT, wintypes.UINT]
+_RegisterHotKey.restype = wintypes.BOOL
+
+_UnregisterHotKey = _user32.UnregisterHotKey
+_UnregisterHotKey.argtypes = [wintypes.HWND, ctypes.c_int]
+_UnregisterHotKey.restype = wintypes.BOOL
+
+_SetTimer = _user32.SetTimer
+_SetTimer.argtypes = [wintypes.HWND, ctypes.c_size_t, wintypes.UINT, ctypes.c_void_p]
+_SetTimer.restype = ctypes.c_size_t
+
+_KillTimer = _user32.KillTimer
+_KillTimer.argtypes = [wintypes.HWND, ctypes.c_size_t]
+_KillTimer.restype = wintypes.BOOL
+
+_GetAsyncKeyState = _user32.GetAsyncKeyState
+_GetAsyncKeyState.argtypes = [ctypes.c_int]
+_GetAsyncKeyState.restype = wintypes.SHORT
+
+_VkKeyScanW = _user32.VkKeyScanW
+_VkKeyScanW.argtypes = [wintypes.WCHAR]
+_VkKeyScanW.restype = wintypes.SHORT
 
 # Global dictionary to store hotkey managers by window handle
 _hotkey_managers = {}
 
-# Global dictionary to store window procedures by window handle
-_window_procedures = {}
+# Window class shared by all hotkey manager windows, registered on first use.
+# The WNDCLASS is kept here while registered, which also keeps its window
+# procedure alive.
+_WINDOW_CLASS_NAME = "WinHotkeysWindow"
+_window_class = None
+_window_class_lock = threading.Lock()
+
+# Process-wide hotkey manager shared by all HotkeyHandler instances
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+# Marks the callback threads while they run a callback
+_callback_context = threading.local()
+
+def _handle_hotkey(hwnd, wparam, lparam):
+    """Queue the callbacks of a pressed hotkey (WM_HOTKEY)."""
+    # wparam contains the hotkey ID
+    hotkey_id = wparam
+    
+    # Get the hotkey manager for this window
+    hotkey_manager = _hotkey_managers.get(hwnd)
+    if hotkey_manager is None:
+        log.debug("Received hotkey message for window %s but it's not in _hotkey_managers", hwnd)
+        return win32gui.DefWindowProc(hwnd, WM_HOTKEY, wparam, lparam)
+    
+    # Look up the hotkey by its ID. Read the entry once, unregister_hotkey()
+    # may replace it or the whole list on another thread meanwhile.
+    hotkeys = hotkey_manager._hotkeys
+    entry = hotkeys[hotkey_id] if 0 <= hotkey_id < len(hotkeys) else None
+    if entry is None:
+        log.debug("Received hotkey ID %d but it's not registered", hotkey_id)
+        return win32gui.DefWindowProc(hwnd, WM_HOTKEY, wparam, lparam)
+    hotkey_callbacks, release_callbacks, details = entry
+    
+    # lparam holds the pressed modifiers and key. They differ from the hotkey's
+    # when the message was queued for an unregistered hotkey whose ID was reused.
+    if (lparam & 0xFFFF) != (details[0] & MOD_KEYS) or (lparam >> 16) != details[1]:
+        log.debug("Received hotkey ID %d for a previously registered hotkey", hotkey_id)
+        return win32gui.DefWindowProc(hwnd, WM_HOTKEY, wparam, lparam)
+    
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Received WM_HOTKEY for hotkey ID %d (%s), queueing callbacks",
+                  hotkey_id, details[2])
+    
+    # Hand the callbacks to the callback threads so that a slow
+    # callback doesn't block the message loop
+    hotkey_manager._dispatch(hotkey_id, hotkey_callbacks)
+    
+    # Watch for the key being released with a timer on this window,
+    # so no extra thread has to spin on the key state
+    if any(release_callbacks):
+        hotkey_manager._release_timers[hotkey_id] = details
+        _SetTimer(hwnd, hotkey_id, RELEASE_POLL_INTERVAL_MS, None)
+    return 0
+
+def _handle_timer(hwnd, wparam, lparam):
+    """Check whether a hotkey with a release callback has been released (WM_TIMER)."""
+    hotkey_manager = _hotkey_managers.get(hwnd)
+    entry = None
+    if hotkey_manager is not None:
+        hotkeys = hotkey_manager._hotkeys
+        if 0 <= wparam < len(hotkeys):
+            entry = hotkeys[wparam]
+    # KillTimer doesn't remove a WM_TIMER that is already queued, so make sure the
+    # timer was set for this hotkey and not for an unregistered one with the same ID
+    if entry is None or not any(entry[1]) or hotkey_manager._release_timers.get(wparam) is not entry[2]:
+        _KillTimer(hwnd, wparam)
+        if hotkey_manager is not None:
+            hotkey_manager._release_timers.pop(wparam, None)
+    elif (_GetAsyncKeyState(entry[2][1]) & 0x8000) == 0:
+        _KillTimer(hwnd, wparam)
+        del hotkey_manager._release_timers[wparam]
+        log.debug("Hotkey ID %d released, queueing release callbacks", wparam)
+        hotkey_manager._dispatch(wparam, entry[1])
+    return 0
+
+def _handle_register(hwnd, wparam, lparam):
+    """Register a hotkey added while the message loop is already running (WM_USER_REGISTER)."""
+    hotkey_manager = _hotkey_managers.get(hwnd)
+    if hotkey_manager is not None:
+        hotkey_manager._register_with_windows(hwnd, wparam)
+    return 0
+
+def _handle_unregister(hwnd, wparam, lparam):
+    """Unregister a hotkey removed while the message loop is running (WM_USER_UNREGISTER)."""
+    _KillTimer(hwnd, wparam)
+    if _UnregisterHotKey(hwnd, wparam):
+        log.debug("Unregistered hotkey ID %d", wparam)
+    else:
+        log.warning("Error unregistering hotkey ID %d: %s", wparam, ctypes.FormatError(ctypes.get_last_error()))
+    return 0
+
+# Handlers for the messages the hotkey windows process themselves, by message ID
+_MSG_HANDLERS = {
+    WM_HOTKEY: _handle_hotkey,
+    WM_TIMER: _handle_timer,
+    WM_USER_REGISTER: _handle_register,
+    WM_USER_UNREGISTER: _handle_unregister,
+}
 
 # Global window procedure function
-def _global_wndproc(hwnd, msg, wparam, lparam):
-    """Global window procedure function for all hotkey manager windows."""
-    try:
-        # Debug logging for all messages
-        print(f"DEBUG: Window procedure received message: {msg} (0x{msg:04x}), wparam: {wparam}, lparam: {lparam}")
-        
-        # Specifically check for WM_HOTKEY (0x0312)
-        if msg == WM_HOTKEY:
-            print(f"DEBUG: WM_HOTKEY message received! ID: {wparam}")
-            
-            # wparam contains the hotkey ID
-            hotkey_id = wparam
-            print(f"DEBUG: Received WM_HOTKEY message for hotkey ID: {hotkey_id}")
-            
-            # Get the hotkey manager for this window
-            if hwnd in _hotkey_managers:
-                hotkey_manager = _hotkey_managers[hwnd]
-                
-                # Call the callback function for this hotkey
-                if hotkey_id in hotkey_manager.registered_hotkeys:
-                    print(f"DEBUG: Found registered hotkey ID {hotkey_id}, calling callback function...")
-                    # Get the hotkey combination for better logging
-                    hotkey_combo = hotkey_manager.registered_hotkeys[hotkey_id]['combination']
-                    print(f"DEBUG: Executing callback for hotkey: {hotkey_combo}")
-                    
-                    # Call the callback
-                    hotkey_manager.registered_hotkeys[hotkey_id]['callback']()
-                    
-                    # Force flush the output to ensure it's displayed immediately
-                    sys.stdout.flush()
-                    
-                    print(f"DEBUG: Callback for hotkey ID {hotkey_id} executed successfully")
-                    return 0
-                else:
-                    print(f"DEBUG: Received hotkey ID {hotkey_id} but it's not in registered_hotkeys")
-            else:
-                print(f"DEBUG: Received hotkey message for window {hwnd} but it's not in _hotkey_managers")
+def _global_wndproc(hwnd, msg, wparam, lparam, _DefWindowProc=win32gui.DefWindowProc,
+                    _get_handler=_MSG_HANDLERS.get, _is_debug=log.isEnabledFor, _DEBUG=logging.DEBUG):
+    """
+    Global window procedure function for all hotkey manager windows.
+    
+    The keyword arguments bind the names used on every message once, as fast locals.
+    """
+    # Debug logging for all messages. This runs for every message the window
+    # receives, so check the level before building the log call.
+    if _is_debug(_DEBUG):
+        log.debug("Window procedure received message: %d (0x%04x), wparam: %s, lparam: %s", msg, msg, wparam, lparam)
+    
+    handler = _get_handler(msg)
+    if handler is not None:
+        return handler(hwnd, wparam, lparam)
+    
+    # Pass the message to the default window procedure
+    return _DefWindowProc(hwnd, msg, wparam, lparam)
+
+def _register_window_class() -> None:
+    """Register the window class used by all hotkey manager windows, once per process."""
+    global _window_class
+    with _window_class_lock:
+        if _window_class is not None:
+            return
+        
+        wndclass = win32gui.WNDCLASS()
+        wndclass.lpszClassName = _WINDOW_CLASS_NAME
+        wndclass.lpfnWndProc = _global_wndproc
+        wndclass.hInstance = win32api.GetModuleHandle(None)
+        win32gui.RegisterClass(wndclass)
+        _window_class = wndclass
+
+def _unregister_window_class() -> None:
+    """Unregister the shared window class. All hotkey manager windows must be destroyed."""
+    global _window_class
+    with _window_class_lock:
+        if _window_class is None:
+            return
+        
+        try:
+            win32gui.UnregisterClass(_WINDOW_CLASS_NAME, win32api.GetModuleHandle(None))
+        except Exception as e:
+            log.warning("Error unregistering window class: %s", e)
+            return
+        _window_class = None
+
+@functools.lru_cache(maxsize=256)
+def _parse_hotkey_combination(hotkey_combination: str) -> Tuple[int, Optional[int]]:
+    """
+    Parse a hotkey combination string into modifiers and a virtual key code.
+    
+    Results are cached, since the same combinations tend to be registered again.
+    
+    Args:
+        hotkey_combination: Hotkey combination string (e.g., 'control+shift+a')
         
-        # Handle custom cleanup message
-        elif msg == WM_USER_CLEANUP:
-            print(f"DEBUG: Received WM_USER_CLEANUP message")
+    Returns:
+        Tuple of (modifiers, vk_code) where modifiers is a bitmask of modifier keys,
+        vk_code is None if the combination could not be parsed
+    """
+    modifiers = 0
+    vk_code = None
+    keys = _SPLIT_RE.split(hotkey_combination.strip().lower())
+    
+    # The last key is the main key, the rest are modifiers
+    if not keys:
+        return modifiers, None
+        
+    main_key = keys[-1]
+    modifier_keys = keys[:-1]
+    
+    # Process modifiers
+    for key in modifier_keys:
+        try:
+            modifiers |= _MOD_MAP[key]
+        except KeyError:
+            log.warning("Unknown modifier key: %s", key)
+            return modifiers, None
             
-            # Get the hotkey manager for this window
-            if hwnd in _hotkey_managers:
-                hotkey_manager = _hotkey_managers[hwnd]
-                
-                # Unregister all hotkeys
-                for hotkey_id in list(hotkey_manager.registered_hotkeys.keys()):
-                    try:
-                        win32gui.UnregisterHotKey(hwnd, hotkey_id)
-                        print(f"Unregistered hotkey ID {hotkey_id}")
-                    except Exception as e:
-                        print(f"Error unregistering hotkey ID {hotkey_id}: {e}")
-                
-                # Remove this hotkey manager from the global dictionary
-                del _hotkey_managers[hwnd]
-                
-                # Post a quit message to exit the message loop
-                win32gui.PostQuitMessage(0)
-                return 0
-                
-        # Pass the message to the default window procedure
-        return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
-    except Exception as e:
-        print(f"Error in window procedure: {e}")
-        import traceback
-        traceback.print_exc()
-        return 0
-
-# Create a window procedure function that can be used with win32gui
-def create_window_proc():
-    """Create a window procedure function that can be used with win32gui."""
-    # This is a hack to create a window procedure function that can be used with win32gui
-    # The function is stored in a dictionary to prevent it from being garbage collected
-    def window_proc(hwnd, msg, wparam, lparam):
-        return _global_wndproc(hwnd, msg, wparam, lparam)
+    # Add MOD_NOREPEAT to prevent auto-repeat
+    modifiers |= MOD_NOREPEAT
+            
+    # Process main key
+    if len(main_key) == 1:
+        # Get the VK code for the character in the current keyboard layout.
+        # VkKeyScanW returns -1 if no key produces it, then try the mapping.
+        vk_scan = _VkKeyScanW(main_key)
+        vk_code = vk_scan & 0xFF if vk_scan != -1 else _VK_MAP.get(main_key)
+    else:
+        # Named keys come from the keycodes mapping
+        vk_code = _VK_MAP.get(main_key)
     
-    # Store the function in the dictionary to prevent it from being garbage collected
-    _window_procedures[window_proc] = window_proc
+    # Debug output to verify the parsed values
+    log.debug("Parsed hotkey combination '%s': main key '%s', modifier keys %s, VK code %s, modifiers 0x%x",
+              hotkey_combination, main_key, modifier_keys, vk_code, modifiers)
     
-    return window_proc
+    return modifiers, vk_code
 
 class HotkeyManager:
     """
     Manages hotkey registration and handling using the Windows RegisterHotKey API.
     """
-    # Class variables
-    _next_id = 1  # Next hotkey ID
-    _next_class_id = 1  # Next window class ID
+    
+    __slots__ = (
+        '_hotkeys', '_ids_by_combo',
+        '_free_ids', '_release_timers', '_lock', 'hwnd', '_message_thread', '_stopped_thread', '_stop_event', '_executor',
+        '_pending', '_pending_lock',
+    )
     
     def __init__(self):
         """Initialize the hotkey manager."""
-        self.registered_hotkeys = {}  # Stores hotkey IDs and their details
-        self.running = False
+        # Hotkeys indexed by hotkey ID, None for unused IDs. IDs start at 1 (timer IDs
+        # must be non-zero), so index 0 is always None. Each entry is a tuple of
+        # (callbacks, release_callbacks, (modifiers, vk_code, combination)) that is
+        # replaced as a whole, so the window procedure can read it without the lock.
+        self._hotkeys = [None]
+        self._ids_by_combo = {}  # Hotkey ID of each registered (modifiers, vk_code)
+        # Unregistered IDs below the end of the list, reused first and oldest first,
+        # so a message still queued for an unregistered hotkey rarely finds its ID reused
+        self._free_ids = deque()
+        self._release_timers = {}  # Details of the hotkey each release timer was set for (message thread only)
+        # Guards ID allocation and changes to the hotkey data, and serializes them with
+        # starting and stopping the message thread. Never held while waiting for the
+        # callback threads, which may need it; the message thread never takes it.
+        self._lock = threading.Lock()
         self.hwnd = None  # Window handle for receiving hotkey messages
         self._message_thread = None  # Thread for the Windows message loop
+        self._stopped_thread = None  # Previous message thread, may still be unregistering its hotkeys
+        self._stop_event = None  # Event handle signaled to stop the message loop
+        self._executor = None  # Thread pool that runs the hotkey callbacks while listening
+        # Events waiting to run, by hotkey ID. A hotkey has an entry while one of its
+        # events is running, so its callbacks run in order and use one thread at a time.
+        self._pending = {}
+        self._pending_lock = threading.Lock()  # Guards _pending
+        
+    @property
+    def running(self) -> bool:
+        """Whether the message thread is alive and listening for hotkeys."""
+        message_thread = self._message_thread
+        return message_thread is not None and message_thread.is_alive()
+        
+    @classmethod
+    def instance(cls) -> 'HotkeyManager':
+        """
+        Get the process-wide hotkey manager, creating it on first use.
+        
+        All HotkeyHandler instances share this manager, so any number of hotkeys
+        costs a single window and a single message thread.
+        
+        Returns:
+            The shared HotkeyManager instance
+        """
+        global _default_manager
+        with _default_manager_lock:
+            if _default_manager is None:
+                _default_manager = cls()
+            return _default_manager
+        
+    @classmethod
+    def parse(cls, hotkey_combination: str) -> Tuple[int, int]:
+        """
+        Parse a hotkey combination string into modifiers and a virtual key code.
+        
+        Args:
+            hotkey_combination: Hotkey combination string (e.g., 'control+shift+a')
+            
+        Returns:
+            Tuple of (modifiers, vk_code) that can be passed to register_parsed_hotkey
+            
+        Raises:
+            ValueError: If the combination contains an unknown key
+        """
+        modifiers, vk_code = _parse_hotkey_combination(hotkey_combination)
+        if vk_code is None:
+            raise ValueError(f"Could not parse hotkey combination: {hotkey_combination!r}")
+        return modifiers, vk_code
         
-    def register_hotkey(self, hotkey_combination: str, callback: Callable, suppress: bool = False) -> None:
+    def register_hotkey(self, hotkey_combination: str, callback: Callable, suppress: bool = False,
+                        release_callback: Optional[Callable] = None) -> int:
         """
         Register a hotkey with a callback function.
+        
+        If the manager is already listening, the hotkey is registered with Windows
+        right away on the message thread. Registering a combination that is already
+        registered adds the callback to the existing hotkey and returns its ID.
 
         Args:
             hotkey_combination: Hotkey combination string (e.g., 'control+shift+a')
             callback: Function to call when the hotkey is pressed
             suppress: Whether to suppress the hotkey (always True with RegisterHotKey)
-        """
-        # Parse the hotkey combination
-        modifiers, vk_code = self._parse_hotkey_combination(hotkey_combination)
-        if vk_code is None:
-            print(f"Warning: Could not parse hotkey combination: {hotkey_combination}")
-            return
+            release_callback: Optional function to call when the main key is released
             
-        # Get a unique ID for this hotkey
-        hotkey_id = HotkeyManager._next_id
-        HotkeyManager._next_id += 1
-        
-        # Store the hotkey details
-        self.registered_hotkeys[hotkey_id] = {
-            'modifiers': modifiers,
-            'vk_code': vk_code,
-            'callback': callback,
-            'combination': hotkey_combination  # Store the original combination for logging
-        }
-        
-        print(f"Registered hotkey: {hotkey_combination} (ID={hotkey_id})")
+        Returns:
+            ID of the registered hotkey
+            
+        Raises:
+            ValueError: If the combination could not be parsed
+            RuntimeError: If all hotkey IDs are in use
+        """
+        modifiers, vk_code = self.parse(hotkey_combination)
+        return self.register_parsed_hotkey(modifiers, vk_code, callback, release_callback,
+                                           hotkey_combination)
 
-    def _parse_hotkey_combination(self, hotkey_combination: str) -> Tuple[int, Optional[int]]:
+    def register_parsed_hotkey(self, modifiers: int, vk_code: int, callback: Callable,
+                               release_callback: Optional[Callable] = None,
+                               hotkey_combination: Optional[str] = None) -> int:
         """
-        Parse a hotkey combination string into modifiers and a virtual key code.
-        
+        Register a hotkey that has already been parsed with parse().
+
         Args:
-            hotkey_combination: Hotkey combination string (e.g., 'control+shift+a')
+            modifiers: Modifier bitmask returned by parse()
+            vk_code: Virtual key code returned by parse()
+            callback: Function to call when the hotkey is pressed
+            release_callback: Optional function to call when the main key is released
+            hotkey_combination: Original combination string, only used for logging
             
         Returns:
-            Tuple of (modifiers, vk_code) where modifiers is a bitmask of modifier keys
+            ID of the registered hotkey
+            
+        Raises:
+            RuntimeError: If all hotkey IDs are in use
         """
-        modifiers = 0
-        vk_code = None
-        keys = [k.strip() for k in hotkey_combination.lower().split('+')]
-        
-        # The last key is the main key, the rest are modifiers
-        if not keys:
-            return modifiers, None
+        if hotkey_combination is None:
+            hotkey_combination = "0x%x+0x%x" % (modifiers, vk_code)
+            
+        with self._lock:
+            # Share the Windows registration of an identical combination
+            hotkey_id = self._ids_by_combo.get((modifiers, vk_code))
+            if hotkey_id is not None:
+                callbacks, release_callbacks, details = self._hotkeys[hotkey_id]
+                self._hotkeys[hotkey_id] = (callbacks + (callback,), release_callbacks + (release_callback,), details)
+                log.debug("Added callback to hotkey: %s (ID=%d)", hotkey_combination, hotkey_id)
+                return hotkey_id
             
-        main_key = keys[-1]
-        modifier_keys = keys[:-1]
-        
-        # Process modifiers
-        for key in modifier_keys:
-            if key == 'control' or key == 'ctrl':
-                modifiers |= win32con.MOD_CONTROL
-            elif key == 'alt':
-                modifiers |= win32con.MOD_ALT
-            elif key == 'shift':
-                modifiers |= win32con.MOD_SHIFT
-            elif key == 'win' or key == 'windows':
-                modifiers |= win32con.MOD_WIN
+            # Store the hotkey details (the original combination is kept for logging)
+            entry = ((callback,), (release_callback,), (modifiers, vk_code, hotkey_combination))
+            if self._free_ids:
+                # Reuse the ID of an unregistered hotkey
+                hotkey_id = self._free_ids.popleft()
+                self._hotkeys[hotkey_id] = entry
             else:
-                print(f"Warning: Unknown modifier key: {key}")
-                return modifiers, None
-                
-        # If no modifiers are specified, use MOD_NOREPEAT to prevent auto-repeat
-        if modifiers == 0:
-            modifiers = MOD_NOREPEAT
-        else:
-            # Add MOD_NOREPEAT to prevent auto-repeat
-            modifiers |= MOD_NOREPEAT
-                
-        # Process main key
-        # First check if it's a single character that we can get the VK code for at runtime
-        if len(main_key) == 1:
-            try:
-                # Get the VK code for the character in the current keyboard layout
-                vk_code = ctypes.windll.user32.VkKeyScanW(ord(main_key)) & 0xFF
-                print(f"DEBUG: Got VK code for '{main_key}' at runtime: {vk_code} (0x{vk_code:x})")
-            except Exception as e:
-                print(f"Error getting VK code for '{main_key}' at runtime: {e}")
-                # Fall back to the dictionary
-                vk_code = vk_key_names.get(main_key)
-        else:
-            # Use the imported vk_key_names dictionary for named keys
-            vk_code = vk_key_names.get(main_key)
-        
-        # Debug output to verify the parsed values
-        print(f"DEBUG: Parsed hotkey combination: '{hotkey_combination}'")
-        print(f"DEBUG: Main key: '{main_key}', Modifiers: {modifier_keys}")
-        if vk_code is not None:
-            print(f"DEBUG: VK code: {vk_code} (0x{vk_code:x}), Modifiers: {modifiers} (0x{modifiers:x})")
-        else:
-            print(f"DEBUG: VK code: None (0x0), Modifiers: {modifiers} (0x{modifiers:x})")
+                # Use the next index as the ID for this hotkey
+                hotkey_id = len(self._hotkeys)
+                if hotkey_id > MAX_HOTKEY_ID:
+                    raise RuntimeError("too many active hotkeys")
+                self._hotkeys.append(entry)
+            self._ids_by_combo[(modifiers, vk_code)] = hotkey_id
             
-        return modifiers, vk_code
+            log.debug("Registered hotkey: %s (ID=%d)", hotkey_combination, hotkey_id)
+            
+            # RegisterHotKey has to be called on the thread that owns the window
+            if self.running and self.hwnd:
+                win32gui.SendMessage(self.hwnd, WM_USER_REGISTER, hotkey_id, 0)
+        
+        return hotkey_id
 
-    def _get_vk_code(self, key: str) -> Optional[int]:
+    def unregister_hotkey(self, hotkey_id: int, callback: Optional[Callable] = None) -> None:
         """
-        Get the virtual key code for a key name.
+        Unregister a hotkey previously returned by register_hotkey.
         
+        The hotkey is unregistered with Windows once no callbacks are left for it.
+        Stops listening once the last hotkey has been unregistered.
+
         Args:
-            key: Key name (e.g., 'a', 'enter', 'f1')
-            
-        Returns:
-            Virtual key code or None if not found
+            hotkey_id: ID of the hotkey to unregister
+            callback: Only remove this callback, instead of all callbacks of the hotkey
         """
-        # Use the imported vk_key_names dictionary
-        return vk_key_names.get(key.lower())
+        with self._lock:
+            if not 0 < hotkey_id < len(self._hotkeys) or self._hotkeys[hotkey_id] is None:
+                return
+            
+            hotkey_callbacks, release_callbacks, details = self._hotkeys[hotkey_id]
+            if callback is not None:
+                if callback not in hotkey_callbacks:
+                    return
+                if len(hotkey_callbacks) > 1:
+                    # Other callbacks still use this hotkey, only drop this one
+                    index = hotkey_callbacks.index(callback)
+                    self._hotkeys[hotkey_id] = (hotkey_callbacks[:index] + hotkey_callbacks[index + 1:],
+                                                release_callbacks[:index] + release_callbacks[index + 1:],
+                                                details)
+                    return
+            
+            # UnregisterHotKey has to be called on the thread that owns the window
+            if self.running and self.hwnd:
+                win32gui.SendMessage(self.hwnd, WM_USER_UNREGISTER, hotkey_id, 0)
+            
+            modifiers, vk_code, _ = details
+            del self._ids_by_combo[(modifiers, vk_code)]
+            self._hotkeys[hotkey_id] = None
+            self._free_ids.append(hotkey_id)
+            
+            if self._ids_by_combo:
+                return
+            
+            # Start again from ID 1 once no hotkeys are left, and stop listening.
+            # Handing off the threads under the lock means a concurrent register
+            # either comes before and keeps them running, or sees them stopped.
+            self._hotkeys = [None]
+            self._free_ids = deque()
+            stopping = self._begin_stop()
+        
+        # Wait outside the lock: a running callback may be waiting for it
+        self._finish_stop(stopping)
 
     def start_listening(self) -> None:
         """Start listening for registered hotkeys."""
-        if self.running:
-            return
-
-        self.running = True
-        
-        def _thread_proc():
-            """Thread procedure that creates the window, registers hotkeys, and pumps messages."""
-            try:
-                # 1) Register window class + create window
-                class_name = f"HotkeyMgr{HotkeyManager._next_class_id}"
-                HotkeyManager._next_class_id += 1
-                
-                # Create a window procedure function
-                window_proc = create_window_proc()
-                
-                wndclass = win32gui.WNDCLASS()
-                wndclass.lpszClassName = class_name
-                wndclass.lpfnWndProc = window_proc
-                wndclass.hInstance = win32api.GetModuleHandle(None)
-                
-                # Register the window class
-                try:
-                    win32gui.RegisterClass(wndclass)
-                except Exception as e:
-                    print(f"Error registering window class: {e}")
-                    self.running = False
-                    return
-                
-                # Create the window
+        with self._lock:
+            if self.running:
+                return
+            
+            if self._executor is not None:
+                # The previous message thread died without being stopped
+                self._executor.shutdown(wait=False)
+            
+            if self._stopped_thread is not None:
+                # Windows refuses to register a combination that the previous window
+                # still holds, so wait until its thread has unregistered them all
+                self._stopped_thread.join()
+                self._stopped_thread = None
+            
+            # The thread proc works with its own copies of these, so a previous
+            # message thread that is still cleaning up can't pick up the new ones
+            stop_event = win32event.CreateEvent(None, False, False, None)
+            ready = threading.Event()
+            self._stop_event = stop_event
+            self.hwnd = None
+            
+            # Run the callbacks on a small thread pool, off the message loop. It has to
+            # exist before the first WM_HOTKEY; its threads are only started on demand.
+            self._executor = ThreadPoolExecutor(max_workers=CALLBACK_THREADS, thread_name_prefix='hotkey-cb')
+            
+            def _thread_proc():
+                """Thread procedure that creates the window, registers hotkeys, and pumps messages."""
                 try:
-                    # Create a normal window (not a message-only window)
-                    self.hwnd = win32gui.CreateWindowEx(
-                        0,  # extended style
-                        class_name,  # class name
-                        f"Hotkey Manager Window {HotkeyManager._next_class_id}",  # window name
-                        0,  # style
-                        0, 0, 0, 0,  # dimensions
-                        0,  # parent - use 0 for a top-level window
-                        0,  # menu
-                        wndclass.hInstance,  # instance
-                        None  # creation parameters
-                    )
-                    
-                    if not self.hwnd:
-                        print("Failed to create window")
-                        self.running = False
+                    # 1) Register window class (first time only) + create window
+                    try:
+                        _register_window_class()
+                    except Exception as e:
+                        log.error("Error registering window class: %s", e)
+                        ready.set()
                         return
                     
-                    # Register this hotkey manager in the global dictionary
-                    _hotkey_managers[self.hwnd] = self
-                except Exception as e:
-                    print(f"Error creating window: {e}")
-                    self.running = False
-                    return
-                
-                # 2) Register all hotkeys on THIS thread
-                for hotkey_id, details in self.registered_hotkeys.items():
+                    # Create the window
                     try:
-                        # Print detailed information about the hotkey being registered
-                        print(f"Registering hotkey ID {hotkey_id}: modifiers={details['modifiers']}, vk_code={details['vk_code']} ({details['combination']})")
+                        # Create a message-only window, it only has to receive
+                        # hotkey messages and is skipped by broadcasts
+                        hwnd = win32gui.CreateWindowEx(
+                            0,  # extended style
+                            _WINDOW_CLASS_NAME,  # class name
+                            "Hotkey Manager Window",  # window name
+                            0,  # style
+                            0, 0, 0, 0,  # dimensions
+                            HWND_MESSAGE,  # parent - makes this a message-only window
+                            0,  # menu
+                            win32api.GetModuleHandle(None),  # instance
+                            None  # creation parameters
+                        )
                         
-                        # Skip the unregistration step for the first registration
-                        # This avoids the "Hot key is not registered" error
-                        print(f"Registering hotkey ID {hotkey_id} ({details['combination']}) for the first time.")
+                        if not hwnd:
+                            log.error("Failed to create window")
+                            ready.set()
+                            return
                         
-                        # Now register the hotkey with improved error handling
-                        try:
-                            success = win32gui.RegisterHotKey(
-                                self.hwnd,
-                                hotkey_id,
-                                details['modifiers'],
-                                details['vk_code']
-                            )
-                            
-                            # Print the return value and last error for debugging
-                            last_error = ctypes.GetLastError()
-                            print(f"RegisterHotKey→ {success}, GetLastError→ {last_error}")
-                            
-                            # In pywin32, RegisterHotKey might return None even on success
-                            # So we check the last error code instead
-                            if last_error == 0:
-                                print(f"Successfully registered hotkey ID {hotkey_id} ({details['combination']})")
-                            else:
-                                error_message = f"RegisterHotKey failed (0x{last_error:08X}): {ctypes.FormatError(last_error)}"
-                                print(f"Failed to register hotkey ID {hotkey_id} ({details['combination']}): {error_message}")
-                                # Don't raise an exception, just log the error and continue
-                                print(f"Will attempt to use the hotkey anyway.")
-                        except win32gui.error as win_error:
-                            # Check if the error is "Hot key is already registered" (error code 1409)
-                            if win_error.winerror == 1409:
-                                print(f"Hotkey ID {hotkey_id} ({details['combination']}) is already registered. This is normal if the application was not closed properly previously.")
-                                # Try to unregister and register again with improved error handling
-                                try:
-                                    win32gui.UnregisterHotKey(self.hwnd, hotkey_id)
-                                    success = win32gui.RegisterHotKey(
-                                        self.hwnd,
-                                        hotkey_id,
-                                        details['modifiers'],
-                                        details['vk_code']
-                                    )
-                                    if success:
-                                        print(f"Successfully re-registered hotkey ID {hotkey_id} ({details['combination']})")
-                                    else:
-                                        err = ctypes.GetLastError()
-                                        if err != 0:  # Only report as an error if the error code is not 0
-                                            error_message = f"Re-RegisterHotKey failed (0x{err:08X}): {ctypes.FormatError(err)}"
-                                            print(f"Failed to re-register hotkey ID {hotkey_id} ({details['combination']}): {error_message}")
-                                            raise OSError(error_message)
-                                        else:
-                                            # Error code 0 means success, so this is not actually an error
-                                            print(f"Successfully re-registered hotkey ID {hotkey_id} ({details['combination']})")
-                                except Exception as e:
-                                    print(f"Error re-registering hotkey ID {hotkey_id}: {e}")
-                                    print(f"Will attempt to use the hotkey anyway.")
-                            else:
-                                # Re-raise other errors
-                                raise
-                    except Exception as reg_error:
-                        print(f"Exception registering hotkey ID {hotkey_id}: {reg_error}")
-                        import traceback
-                        traceback.print_exc()
-                
-                # 3) Pump messages here
-                print("DEBUG: Message loop started")
-                print("HotkeyManager: entering PumpMessages")
-                
-                # This will block and process all messages, including WM_HOTKEY,
-                # until win32gui.PostQuitMessage() is called
-                win32gui.PumpMessages()
-                
-                print("HotkeyManager: Message loop exited.")
-            except Exception as e:
-                print(f"Error in thread procedure: {e}")
-                import traceback
-                traceback.print_exc()
-                self.running = False
+                        # Register this hotkey manager in the global dictionary
+                        _hotkey_managers[hwnd] = self
+                        self.hwnd = hwnd
+                    except Exception as e:
+                        log.error("Error creating window: %s", e)
+                        ready.set()
+                        return
+                    
+                    # 2) Register all hotkeys on THIS thread
+                    self._register_all_with_windows(hwnd)
+                    
+                    # The window and hotkeys are in place, let start_listening() return
+                    ready.set()
+                    
+                    # 3) Pump messages here until the stop event is signaled
+                    self._message_loop(stop_event)
+                    
+                    # 4) Clean up on the thread that owns the window and the hotkeys
+                    self._cleanup_window(hwnd)
+                except Exception:
+                    log.exception("Error in thread procedure")
+                    ready.set()
+            
+            # Start the thread and wait until it has created the window, so that
+            # self.hwnd is valid (or the start has failed) when this method returns.
+            # Registering and unregistering wait for the lock until then.
+            self._message_thread = threading.Thread(target=_thread_proc, daemon=True)
+            self._message_thread.start()
+            ready.wait()
+            
+            if not self.hwnd:
+                # The thread could not create the window and is exiting
+                self._message_thread.join()
+                self._message_thread = None
+                self._executor.shutdown()
+                self._executor = None
+                return
+        
+        log.debug("Started listening for hotkeys in background thread")
+
+    def _register_with_windows(self, hwnd: int, hotkey_id: int) -> None:
+        """
+        Register a single hotkey with Windows. Must run on the message thread.
+        
+        Args:
+            hwnd: Handle of the window owned by the message thread
+            hotkey_id: ID of the hotkey
+        """
+        modifiers, vk_code, combination = self._hotkeys[hotkey_id][2]
+        log.debug("Registering hotkey ID %d: modifiers=%d, vk_code=%d (%s)", hotkey_id, modifiers, vk_code, combination)
         
-        # Start the thread
-        self._message_thread = threading.Thread(target=_thread_proc, daemon=True)
-        self._message_thread.start()
+        if _RegisterHotKey(hwnd, hotkey_id, modifiers, vk_code):
+            log.debug("Successfully registered hotkey ID %d (%s)", hotkey_id, combination)
+            return
+        
+        last_error = ctypes.get_last_error()
+        if last_error == ERROR_HOTKEY_ALREADY_REGISTERED:
+            log.debug("Hotkey ID %d (%s) is already registered. This is normal if the application was not closed properly previously.",
+                      hotkey_id, combination)
+            # Try to unregister and register again
+            _UnregisterHotKey(hwnd, hotkey_id)
+            if _RegisterHotKey(hwnd, hotkey_id, modifiers, vk_code):
+                log.debug("Successfully re-registered hotkey ID %d (%s)", hotkey_id, combination)
+                return
+            last_error = ctypes.get_last_error()
+        
+        # Don't raise an exception, just log the error and continue
+        log.warning("Failed to register hotkey ID %d (%s): RegisterHotKey failed (0x%08X): %s",
+                    hotkey_id, combination, last_error, ctypes.FormatError(last_error))
+
+    def _register_all_with_windows(self, hwnd: int) -> None:
+        """
+        Register all hotkeys with Windows in one pass. Must run on the message thread.
+        
+        Hotkeys reported as already registered are retried once after the first
+        pass, and all failures are logged together at the end.
+        
+        Args:
+            hwnd: Handle of the window owned by the message thread
+        """
+        registered = 0
+        already_registered = []
+        failed = []
+        for hotkey_id, entry in enumerate(self._hotkeys):
+            if entry is None:
+                continue
+            details = entry[2]
+            if _RegisterHotKey(hwnd, hotkey_id, details[0], details[1]):
+                registered += 1
+                continue
+            last_error = ctypes.get_last_error()
+            if last_error == ERROR_HOTKEY_ALREADY_REGISTERED:
+                already_registered.append(hotkey_id)
+            else:
+                failed.append((hotkey_id, last_error))
         
-        # Register cleanup on exit
-        atexit.register(self.stop_listening)
+        # Retry the hotkeys that are still registered, which is normal if the
+        # application was not closed properly previously
+        for hotkey_id in already_registered:
+            _UnregisterHotKey(hwnd, hotkey_id)
+        for hotkey_id in already_registered:
+            modifiers, vk_code, _ = self._hotkeys[hotkey_id][2]
+            if _RegisterHotKey(hwnd, hotkey_id, modifiers, vk_code):
+                registered += 1
+            else:
+                failed.append((hotkey_id, ctypes.get_last_error()))
         
-        print("HotkeyManager: Started listening for hotkeys in background thread.")
+        log.debug("Registered %d hotkeys (%d retried)", registered, len(already_registered))
+        if failed:
+            # Don't raise an exception, just log the errors and continue
+            log.warning("Failed to register %d hotkeys: %s", len(failed), "; ".join(
+                "ID %d (%s): RegisterHotKey failed (0x%08X): %s"
+                % (hotkey_id, self._hotkeys[hotkey_id][2][2], last_error, ctypes.FormatError(last_error))
+                for hotkey_id, last_error in failed
+            ))
 
     def stop_listening(self) -> None:
         """Stop listening for hotkeys and clean up."""
-        if not self.running:
-            return
+        with self._lock:
+            stopping = self._begin_stop()
+        self._finish_stop(stopping)
 
+    def _begin_stop(self) -> Optional[Tuple[threading.Thread, ThreadPoolExecutor]]:
+        """
+        Detach the message thread and callback pool and tell the thread to exit.
+        
+        Must be called with the lock held. From here on the manager counts as
+        stopped, and a new start_listening() call starts a new message thread
+        once this one has exited.
+        
+        Returns:
+            The (message thread, pool) to pass to _finish_stop(), or None if not listening
+        """
+        message_thread = self._message_thread
+        if message_thread is None:
+            return None
+        executor = self._executor
+        self._message_thread = None
+        self._stopped_thread = message_thread
+        self._executor = None
+        
+        # Wake up the message thread; it unregisters the hotkeys and exits
+        win32event.SetEvent(self._stop_event)
+        log.debug("Signaled stop event to window thread")
+        return message_thread, executor
+
+    def _finish_stop(self, stopping: Optional[Tuple[threading.Thread, ThreadPoolExecutor]]) -> None:
+        """
+        Wait for the threads detached by _begin_stop(). Must be called without the lock.
+        
+        Args:
+            stopping: Return value of _begin_stop()
+        """
+        if stopping is None:
+            return
+        message_thread, executor = stopping
         try:
-            self.running = False
+            # Wait for the message thread to finish its cleanup. The stop event
+            # wakes it up right away, so no timeout is needed. This also prevents
+            # issues with daemon threads during interpreter shutdown.
+            if message_thread is not threading.current_thread():
+                message_thread.join()
             
-            # Send a custom cleanup message to the window thread
-            if self.hwnd:
-                # Post our custom cleanup message to the window
-                # This will be handled by the window procedure in the window thread
-                win32gui.PostMessage(self.hwnd, WM_USER_CLEANUP, 0, 0)
-                print("HotkeyManager: Posted cleanup message to window thread")
-                
-                # Give the thread a little time to process the cleanup message
-                # This helps prevent issues with daemon threads during interpreter shutdown
-                time.sleep(0.1)
+            # Let the callback threads finish the queued callbacks and exit. When a
+            # callback stops the manager itself, it can't wait for its own thread.
+            executor.shutdown(wait=not getattr(_callback_context, 'active', False))
                 
-            # Don't wait for the message thread to exit, as it will exit on its own
-            # when it receives the WM_USER_CLEANUP message
-                
-            print("HotkeyManager: Stopped listening for hotkeys.")
-        except Exception as e:
-            print(f"Error in stop_listening: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("Stopped listening for hotkeys")
+        except Exception:
+            log.exception("Error in stop_listening")
 
-    def _wndproc(self, hwnd: int, msg: int, wparam: int, lparam: int) -> int:
+    def _message_loop(self, stop_event) -> None:
         """
-        Window procedure for handling hotkey messages.
+        Run the Windows message loop until the stop event is signaled.
+        
+        The thread blocks in MsgWaitForMultipleObjects, so it only wakes up when a
+        message arrives or stop_listening() signals the stop event.
         
         Args:
-            hwnd: Window handle
-            msg: Message ID
-            wparam: Message parameter (hotkey ID for WM_HOTKEY)
-            lparam: Message parameter
+            stop_event: Event handle created for this message thread
+        """
+        log.debug("Message loop started")
+        handles = [stop_event]
+        while True:
+            result = win32event.MsgWaitForMultipleObjects(
+                handles, False, win32event.INFINITE, win32event.QS_ALLINPUT
+            )
+            if result == win32event.WAIT_OBJECT_0:
+                # stop_listening() signaled the stop event
+                break
             
-        Returns:
-            Result of message processing
+            # A message is available, dispatch everything that is queued.
+            # PumpWaitingMessages returns non-zero when WM_QUIT was received.
+            if win32gui.PumpWaitingMessages():
+                break
+        log.debug("Message loop exited")
+
+    def _dispatch(self, hotkey_id: int, callbacks: Tuple[Optional[Callable], ...]) -> None:
+        """
+        Run the callbacks of one hotkey event on a callback thread. Called on the message thread.
+        
+        If an earlier event of the same hotkey is still running, the event is queued
+        behind it instead, so a slow hotkey doesn't take up more than one thread.
+        
+        Args:
+            hotkey_id: ID of the hotkey
+            callbacks: Press or release callbacks of the hotkey
         """
+        executor = self._executor
+        if executor is None:  # None once stop_listening() has taken over the pool
+            return
+        with self._pending_lock:
+            pending = self._pending.get(hotkey_id)
+            if pending is not None:
+                pending.append(callbacks)
+                return
+            self._pending[hotkey_id] = deque()
+        executor.submit(self._run_callbacks, executor, hotkey_id, callbacks)
+
+    def _run_callbacks(self, executor: ThreadPoolExecutor, hotkey_id: int,
+                       callbacks: Tuple[Optional[Callable], ...]) -> None:
+        """
+        Run the callbacks of one hotkey event, then hand on the hotkey's next queued event.
+        
+        Args:
+            executor: Pool this task runs on
+            hotkey_id: ID of the hotkey
+            callbacks: Press or release callbacks of the hotkey
+        """
+        _callback_context.active = True
         try:
-            # Debug logging for all messages
-            print(f"DEBUG: Window procedure received message: {msg}")
-            
-            if msg == WM_HOTKEY:
-                # wparam contains the hotkey ID
-                hotkey_id = wparam
-                print(f"DEBUG: Received WM_HOTKEY message for hotkey ID: {hotkey_id}")
+            while True:
+                for callback in callbacks:
+                    if callback is None:
+                        continue
+                    try:
+                        callback()
+                    except Exception:
+                        log.exception("Hotkey callback failed")
                 
-                # Call the callback function for this hotkey
-                if hotkey_id in self.registered_hotkeys:
-                    print(f"DEBUG: Found registered hotkey ID {hotkey_id}, calling callback function...")
-                    # Get the hotkey combination for better logging
-                    hotkey_combo = self.registered_hotkeys[hotkey_id]['combination']
-                    print(f"DEBUG: Executing callback for hotkey: {hotkey_combo}")
-                    
-                    # Call the callback
-                    self.registered_hotkeys[hotkey_id]['callback']()
-                    
-                    print(f"DEBUG: Callback for hotkey ID {hotkey_id} executed successfully")
-                    return 0
-                else:
-                    print(f"DEBUG: Received hotkey ID {hotkey_id} but it's not in registered_hotkeys")
-                    
-            # Pass the message to the default window procedure
-            return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
-        except Exception as e:
-            print(f"Error in window procedure: {e}")
-            import traceback
-            traceback.print_exc()
-            return 0
+                with self._pending_lock:
+                    pending = self._pending[hotkey_id]
+                    if not pending:
+                        del self._pending[hotkey_id]
+                        return
+                    callbacks = pending.popleft()
+                
+                # Go back to the end of the pool's queue, so other hotkeys get their turn
+                try:
+                    executor.submit(self._run_callbacks, executor, hotkey_id, callbacks)
+                    return
+                except RuntimeError:
+                    pass  # The pool is shutting down, finish the queue here
+        finally:
+            _callback_context.active = False
 
-    def _message_loop(self) -> None:
-        """Run the Windows message loop to process hotkey messages."""
+    def _cleanup_window(self, hwnd: int) -> None:
+        """
+        Unregister all hotkeys and destroy the window. Runs on the message thread.
+        
+        Args:
+            hwnd: Handle of the window owned by the message thread
+        """
+        # Snapshot the registered IDs once, other threads may change the list meanwhile
+        hotkey_ids = tuple(hotkey_id for hotkey_id, entry in enumerate(self._hotkeys) if entry is not None)
+        for hotkey_id in hotkey_ids:
+            _KillTimer(hwnd, hotkey_id)
+            if _UnregisterHotKey(hwnd, hotkey_id):
+                log.debug("Unregistered hotkey ID %d", hotkey_id)
+            else:
+                log.warning("Error unregistering hotkey ID %d: %s", hotkey_id, ctypes.FormatError(ctypes.get_last_error()))
+        
+        # Remove this hotkey manager from the global dictionary
+        _hotkey_managers.pop(hwnd, None)
+        
         try:
-            print("DEBUG: Message loop started")
-            print("HotkeyManager: entering PumpMessages")
-            
-            # This will block and process all messages, including WM_HOTKEY,
-            # until win32gui.PostQuitMessage() is called
-            win32gui.PumpMessages()
-            
-            print("HotkeyManager: Message loop exited.")
+            win32gui.DestroyWindow(hwnd)
         except Exception as e:
-            print(f"Error in message loop: {e}")
-            import traceback
-            traceback.print_exc()
+            log.warning("Error destroying window: %s", e)
+        
+        # A restarted manager may already have its next window
+        if self.hwnd == hwnd:
+            self.hwnd = None
+
+
+def _stop_all_managers() -> None:
+    """Stop all running hotkey managers and release the window class when the interpreter exits."""
+    for hotkey_manager in list(_hotkey_managers.values()):
+        hotkey_manager.stop_listening()
+    _unregister_window_class()
+
+
+# Register cleanup on exit once for all managers
+atexit.register(_stop_all_managers)
 
 
 class HotkeyHandler:
     """
     Handles hotkey functionality using HotkeyManager.
     Provides a simple interface for registering and handling hotkeys.
+    All handlers share the process-wide HotkeyManager.instance().
     """
 
-    def __init__(self, hotkey_combination: str, callback: Callable, suppress: bool = False):
+    __slots__ = (
+        'hotkey_manager', 'hotkey_combination', 'callback', 'suppress', 'release_callback',
+        '_parsed', '_hotkey_id',
+    )
+
+    def __init__(self, hotkey_combination: str, callback: Callable, suppress: bool = False,
+                 release_callback: Optional[Callable] = None):
         """
         Initialize the hotkey handler.
 
@@ -498,17 +880,32 @@ class HotkeyHandler:
             hotkey_combination: Hotkey combination string (e.g., 'control+shift+f12')
             callback: Function to call when the hotkey is pressed
             suppress: Whether to suppress the hotkey so it doesn't trigger in other applications
+            release_callback: Optional function to call when the main key is released (e.g., push-to-talk)
+
+        Raises:
+            ValueError: If the hotkey combination could not be parsed
         """
-        self.hotkey_manager = HotkeyManager()
+        self.hotkey_manager = HotkeyManager.instance()
         self.hotkey_combination = hotkey_combination
+        self._parsed = HotkeyManager.parse(hotkey_combination)  # (modifiers, vk_code)
         self.callback = callback
         self.suppress = suppress
+        self.release_callback = release_callback
+        self._hotkey_id = None  # ID of the hotkey while the handler is started
 
     def start(self) -> None:
         """Start the hotkey handler."""
-        self.hotkey_manager.register_hotkey(self.hotkey_combination, self.callback, self.suppress)
+        if self._hotkey_id is not None:
+            return
+        modifiers, vk_code = self._parsed
+        self._hotkey_id = self.hotkey_manager.register_parsed_hotkey(
+            modifiers, vk_code, self.callback, self.release_callback, self.hotkey_combination
+        )
         self.hotkey_manager.start_listening()
 
     def stop(self) -> None:
         """Stop the hotkey handler."""
-        self.hotkey_manager.stop_listening()
+        if self._hotkey_id is None:
+            return
+        self.hotkey_manager.unregister_hotkey(self._hotkey_id, self.callback)
+        self._hotkey_id = None